@@ -17,10 +17,14 @@ import datetime
 import getopt
 from gamzia.colours import Colours as C
 from gamzia.timer import Timer
-from gamzia.datastructures import Stack, Queue, BinaryTree, TRAVERSALS
+from gamzia.datastructures import Stack, Queue, TRAVERSALS
 import os
 import sys
 import io
+import timeit
+from array import array
+from bisect import bisect_right
+from itertools import compress
 
 
 ### DATA ###
@@ -50,7 +54,22 @@ DEF_TEST      = False          # Run test cases?
 DEF_HASHEADER = False          # Yes to 2 byte location header?
 DEF_OUTEXT    = ".asm"         # Default output extension
 DEF_LOGOPEN   = False          # Monitor on log file status
-
+DEF_PAGES     = False          # Report page crossing penalties instead of listing
+DEF_PAGEEXT   = ".pages"       # Default page report extension
+DEF_INDEXMAX  = 0x40           # Largest index register value assumed plausible
+DEF_SYMBOLS   = ""             # Symbol map used to annotate operands
+DEF_C64MAP    = "C64_SymbolMap.csv" # Bundled Commodore 64 symbol map
+DEF_SYMCACHE  = ".cache"       # Suffix of a symbol map's compiled cache file
+
+# Instructions which overwrite each register (shifts on A handled separately)
+REGISTER_WRITERS = {
+   "A": ("LDA", "ADC", "SBC", "AND", "ORA", "EOR", "TXA", "TYA", "PLA"),
+   "X": ("LDX", "TAX", "TSX", "INX", "DEX"),
+   "Y": ("LDY", "TAY", "INY", "DEY"),
+}
+
+# Instructions which write to their operand's memory address
+MEMORY_WRITERS = ("STA", "STX", "STY", "INC", "DEC", "ASL", "LSR", "ROL", "ROR")
 
 ### CODE ####
 
@@ -71,6 +90,9 @@ class Config:
       self.logfile=DEF_LOGFILE
       self.logfileHandle=None
       self.hasHeader=DEF_HASHEADER
+      self.isPages=DEF_PAGES
+      self.indexMax=DEF_INDEXMAX
+      self.symbolfile=DEF_SYMBOLS
       self.inputfile=""
       self.outputfile=""
 
@@ -160,6 +182,8 @@ class Kdis6502:
       self.date=APP_DATE
       self.__opmatrix="6502_OpcodeMatrix.csv"
       self.opcodes={}
+      self.__table=None
+      self.__symbols=None
 
       # Load opcode data. If file error, abort constructor and error out.
       # Bad practie in standard OOP, but considered pythonic
@@ -179,13 +203,41 @@ class Kdis6502:
          # Build dictionary
          for line in lines:
             seg=line.rstrip().split(',')
-            self.opcodes[seg[0]] = [seg[1],seg[2],seg[3],seg[4],seg[7],seg[8]]
+            self.opcodes[seg[0]] = [seg[1],seg[2],seg[3],seg[4],seg[7],seg[8],seg[5],seg[6]]
 
       except Exception as e:
          error(f"File access error to {self.__opmatrix}\n\"{e}\"")
 
+      # Page analysis needs both branch penalties; refuse an incomplete matrix
+      for controlByte, fields in self.opcodes.items():
+         if fields[1]=="rel" and not (fields[6] and fields[7]):
+            error(f"No PAGE-X / ON-PAGE penalty in {self.__opmatrix} for branch {controlByte} ({fields[0]})")
+
       # END Construtor
 
+   # Returns a 256 entry lookup table indexed by control byte value.
+   # Each entry is (opcode, addressing, bytes, cycles), or None if illegal.
+   # Built once from the opcode dictionary and cached; used by the compact
+   # InstructionStream so rows never need to store these properties.
+   def getTable(self):
+      if self.__table is None:
+         table=[None]*256
+         for controlByte in self.opcodes.keys():
+            table[int(controlByte, 16)]=(self.getOpcode(controlByte),
+                                         self.getAddressing(controlByte),
+                                         self.getBytes(controlByte),
+                                         self.getCycles(controlByte))
+         self.__table=table
+      return(self.__table)
+
+   # Sets the SymbolMap used to annotate operands (None to disable)
+   def setSymbols(self, symbols):
+      self.__symbols=symbols
+
+   # Returns the SymbolMap used to annotate operands, or None
+   def getSymbols(self):
+      return(self.__symbols)
+
    # Checks if a one byte control byte is legal for the 6502 standard matrix
    def isLegal(self, controlByte):
       return (controlByte in self.opcodes.keys())
@@ -232,6 +284,208 @@ class Kdis6502:
       else:
          return ""
 
+   # Returns the extra cycles this control byte costs when its effective
+   # address (or branch target) lies on a different page. For branches this
+   # includes the cycle for the branch being taken.
+   def getPagePenalty(self, controlByte):
+      if self.isLegal(controlByte) and self.opcodes[controlByte][6]:
+         return int(self.opcodes[controlByte][6])
+      else:
+         return 0
+
+   # Returns the extra cycles a branch costs when taken to the same page
+   def getOnPagePenalty(self, controlByte):
+      if self.isLegal(controlByte) and self.opcodes[controlByte][7]:
+         return int(self.opcodes[controlByte][7])
+      else:
+         return 0
+
+   # Returns the address a branch, JMP or JSR row transfers control to,
+   # or None for any other row (including indirect JMP)
+   def getTarget(self, row):
+      if row.addressing=="rel":
+         offset=row.operand-256 if row.operand>127 else row.operand
+         return((row.address+2+offset) & 0xFFFF)
+      if row.mnemonic in ("JMP", "JSR") and row.addressing=="abs":
+         return(row.operand)
+      return(None)
+
+   # Returns a list of (start, end) address ranges enclosed by a backward
+   # branch or backward JMP; these are treated as loop bodies.
+   def findLoops(self, stream):
+      loops=[]
+      for row in stream:
+         if row.mnemonic=="JSR":
+            continue
+         target=self.getTarget(row)
+         if target is not None and target<=row.address:
+            loops.append((target, row.address))
+      return(loops)
+
+   # Returns the base address held by zero page pointer 'pointer', or None
+   # if either byte is unknown in 'zeropage' (address -> known value)
+   @staticmethod
+   def getPointer(pointer, zeropage):
+      low=zeropage.get(pointer)
+      high=zeropage.get((pointer+1) & 0xFF)
+      if low is None or high is None:
+         return(None)
+      return((high<<8) | low)
+
+   # Returns what a row may overwrite, as (registers, zero page bytes).
+   # The zero page part is a set of addresses, or None for "any byte".
+   # 'zeropage' holds known pointer values, used to place ind-y writes.
+   def getWrites(self, row, zeropage):
+      mnemonic=row.mnemonic
+      addressing=row.addressing
+      if mnemonic=="JSR":
+         return({"A", "X", "Y"}, None)
+
+      registers={register for register, writers in REGISTER_WRITERS.items() if mnemonic in writers}
+      written=set()
+      if mnemonic in MEMORY_WRITERS:
+         if addressing=="A":
+            registers.add("A")
+         elif addressing in ("zp", "abs"):
+            if row.operand<0x100:
+               written.add(row.operand)
+         elif addressing in ("abs-x", "abs-y"):
+            if row.operand<0x100:
+               written=None
+         elif addressing=="ind-y":
+            base=self.getPointer(row.operand, zeropage)
+            if base is None or base<0x100:
+               written=None
+         else:
+            # zp-x, zp-y and ind-x may write any zero page byte
+            written=None
+      return(registers, written)
+
+   # Returns what the loop body from row 'index' up to address 'end' may
+   # overwrite, in the same form as getWrites().  Direct writes are found
+   # first, so that ind-y stores are only placed through pointers that the
+   # body leaves alone.
+   def getLoopWrites(self, stream, index, end, zeropage):
+      body=[]
+      while index<len(stream) and stream.addresses[index]<=end:
+         body.append(stream[index])
+         index+=1
+
+      registers=set()
+      written=set()
+      for row in body:
+         if row.addressing!="ind-y":
+            rowRegisters, rowWritten=self.getWrites(row, zeropage)
+            registers|=rowRegisters
+            written=None if written is None or rowWritten is None else written|rowWritten
+
+      known={} if written is None else {k: v for k, v in zeropage.items() if k not in written}
+      for row in body:
+         if row.addressing=="ind-y":
+            rowRegisters, rowWritten=self.getWrites(row, known)
+            registers|=rowRegisters
+            written=None if written is None or rowWritten is None else written|rowWritten
+      return(registers, written)
+
+   # Scans a decoded InstructionStream for instructions that pay a page
+   # crossing penalty, and returns a list of findings ranked by loop depth
+   # (deepest first), then by penalty, then by address.
+   # Each finding is a dictionary with the row index, address, kind
+   # ("branch" or "indexed"), cycle penalty, loop depth and a reason.
+   # - Branches are flagged when the target and the next instruction lie on
+   #   different pages; the penalty is the extra cycle over a same-page
+   #   taken branch.
+   # - abs-x / abs-y are flagged when some index from 0 to 'indexMax' would
+   #   carry out of the base address' page.
+   # - ind-y is only checked when its zero page pointer was set from
+   #   immediate loads earlier in the stream; otherwise the base is unknown.
+   #   The scan is linear, so at a loop head only what the loop body may
+   #   overwrite is forgotten, and at any other jump target (or after JSR)
+   #   everything is.
+   def findPagePenalties(self, stream, indexMax=DEF_INDEXMAX):
+      findings=[]
+      registers={}
+      zeropage={}
+
+      loops=self.findLoops(stream)
+      heads={}
+      for start, end in loops:
+         heads.setdefault(start, []).append(end)
+      entries=set()
+      for row in stream:
+         target=self.getTarget(row)
+         if target is not None and (row.mnemonic=="JSR" or target>row.address):
+            entries.add(target)
+
+      for row in stream:
+         if row.isTruncated:
+            continue
+         mnemonic=row.mnemonic
+         addressing=row.addressing
+         penalty=self.getPagePenalty(row.controlByte)
+         reason=""
+
+         # Control may arrive here from elsewhere; forget what may differ
+         if row.address in entries:
+            registers.clear()
+            zeropage.clear()
+         elif row.address in heads:
+            for end in heads[row.address]:
+               loopRegisters, loopWritten=self.getLoopWrites(stream, row.index, end, zeropage)
+               for register in loopRegisters:
+                  registers.pop(register, None)
+               if loopWritten is None:
+                  zeropage.clear()
+               else:
+                  for address in loopWritten:
+                     zeropage.pop(address, None)
+
+         if addressing=="rel":
+            after=(row.address+2) & 0xFFFF
+            target=self.getTarget(row)
+            if (target & 0xFF00)!=(after & 0xFF00):
+               penalty-=self.getOnPagePenalty(row.controlByte)
+               reason=f"taken branch to ${target:04X} leaves page ${after>>8:02X}"
+
+         elif addressing in ("abs-x", "abs-y") and penalty:
+            carry=0x100-(row.operand & 0xFF)
+            if carry<=indexMax:
+               register=addressing[-1].upper()
+               reason=f"{register} >= ${carry:02X} crosses from page ${row.operand>>8:02X}"
+
+         elif addressing=="ind-y" and penalty:
+            base=self.getPointer(row.operand, zeropage)
+            if base is not None and 0x100-(base & 0xFF)<=indexMax:
+               reason=f"Y >= ${0x100-(base & 0xFF):02X} crosses from page ${base>>8:02X} via (${row.operand:02X})"
+
+         if reason:
+            findings.append({"index": row.index, "address": row.address,
+                             "kind": "branch" if addressing=="rel" else "indexed",
+                             "penalty": penalty, "depth": 0, "reason": reason})
+
+         # Forget whatever this row may overwrite, then track immediate
+         # register loads and the zero page stores that follow them, so
+         # ind-y pointers can be resolved.
+         rowRegisters, rowWritten=self.getWrites(row, zeropage)
+         for register in rowRegisters:
+            registers.pop(register, None)
+         if rowWritten is None:
+            zeropage.clear()
+         else:
+            for address in rowWritten:
+               zeropage.pop(address, None)
+
+         if addressing=="imm" and mnemonic in ("LDA", "LDX", "LDY"):
+            registers[mnemonic[-1]]=row.operand
+         elif (mnemonic in ("STA", "STX", "STY") and addressing in ("zp", "abs") and
+               row.operand<0x100 and mnemonic[-1] in registers):
+            zeropage[row.operand]=registers[mnemonic[-1]]
+
+      for finding in findings:
+         finding["depth"]=sum(1 for start, end in loops if start<=finding["address"]<=end)
+      findings.sort(key=lambda f: (-f["depth"], -f["penalty"], f["address"]))
+      return(findings)
+
    # Returns a hex string from 2 endian bytes, zero pads front; uppercase
    # Returns from $0000 to $FFFF
    @staticmethod
@@ -325,6 +579,13 @@ class Kdis6502:
          # Relative (offset): OPC $XX
          result=f"{opc} ({self.getHexByte(data)}, Y)"
 
+      # Annotate memory operands with their platform symbol, if any
+      if (self.__symbols is not None and data and
+          addressing not in ("A", "imm", "imp", "rel")):
+         name=self.__symbols.resolve(int.from_bytes(data, "little"))
+         if name:
+            result=f"{result:<16} ; {name}"
+
       return(result)
       
    # Implements len routine for class, based on number of opcodes
@@ -389,6 +650,364 @@ class Kdis6502:
 
 #*************************************************************************
 
+#*************************************************************************
+# A lazy, read-only view onto one row of an InstructionStream.
+# It holds only the stream and the row index; every property is read from
+# the stream's columns (or derived from the opcode table) on access.
+class InstructionView:
+   __slots__=("stream", "index")
+
+   def __init__(self, stream, index):
+      self.stream=stream
+      self.index=index
+
+   # Memory address of the control byte
+   @property
+   def address(self):
+      return(self.stream.addresses[self.index])
+
+   # Control byte value (0-255)
+   @property
+   def byte(self):
+      return(self.stream.controlBytes[self.index])
+
+   # Operand value (0-65535); zero for implied / accumulator instructions
+   @property
+   def operand(self):
+      return(self.stream.operands[self.index])
+
+   # Control byte as the two character key used by Kdis6502
+   @property
+   def controlByte(self):
+      return(f"{self.byte:02X}")
+
+   @property
+   def mnemonic(self):
+      return(self.stream.getMnemonic(self.index))
+
+   @property
+   def addressing(self):
+      return(self.stream.getAddressing(self.index))
+
+   @property
+   def length(self):
+      return(self.stream.getLength(self.index))
+
+   @property
+   def cycles(self):
+      return(self.stream.getCycles(self.index))
+
+   # True if the image ended before this instruction's operand did
+   @property
+   def isTruncated(self):
+      return(self.address in self.stream.truncated)
+
+   # Operand as the 0-2 little endian bytes decodeByAddressing() expects;
+   # a truncated row only has the bytes that were in the image
+   @property
+   def data(self):
+      return(self.operand.to_bytes(2, "little")[:max(self.length-1, 0)])
+
+   # Renders this row as an assembly statement.  A truncated row is shown
+   # as the raw bytes it has, since its operand is incomplete.
+   def toString(self):
+      if self.isTruncated:
+         values=", ".join(f"${value:02X}" for value in bytes((self.byte,))+self.data)
+         return(f".byte {values:<10} ; truncated {self.mnemonic}")
+      return(self.stream.kdis.decodeByAddressing(self.controlByte, self.data))
+
+   def __str__(self):
+      return(self.toString())
+
+   def __repr__(self):
+      return(f"InstructionView({self.address:04X}: {self.toString()})")
+
+#*************************************************************************
+
+#*************************************************************************
+# Compact, structure-of-arrays container for decoded instructions.
+# Each row costs 5 bytes: a 16 bit address, the control byte, and a 16 bit
+# operand, held in parallel array / bytearray columns.  Mnemonic,
+# addressing mode, length and cycles are never stored; they are looked up
+# in the opcode table whenever a row is read.
+# NOTE: Illegal control bytes are kept as 1 byte rows with no mnemonic.
+# A final instruction cut short by the end of the image is recorded in
+# 'truncated' (address -> bytes actually present) rather than widened.
+class InstructionStream:
+
+   def __init__(self, kdis):
+      self.kdis=kdis
+      self.addresses=array("H")
+      self.controlBytes=bytearray()
+      self.operands=array("H")
+      self.truncated={}
+      self._table=kdis.getTable()
+
+   # Decodes a block of 6502 machine code starting at address 'origin'.
+   # A truncated final instruction keeps whatever operand bytes remain.
+   # This is a factory method so it must be static
+   @staticmethod
+   def fromBytes(kdis, data, origin=0) -> InstructionStream:
+      stream=InstructionStream(kdis)
+      table=stream._table
+      addresses=stream.addresses
+      controlBytes=stream.controlBytes
+      operands=stream.operands
+      i=0
+      size=len(data)
+      while i<size:
+         controlByte=data[i]
+         entry=table[controlByte]
+         length=entry[2] if entry else 1
+         addresses.append((origin+i) & 0xFFFF)
+         controlBytes.append(controlByte)
+         operands.append(int.from_bytes(data[i+1:i+length], "little"))
+         if i+length>size:
+            stream.truncated[(origin+i) & 0xFFFF]=size-i
+         i+=length
+      return(stream)
+
+   # Adds a single row to the end of the stream
+   def append(self, address, controlByte, operand=0):
+      self.addresses.append(address)
+      self.controlBytes.append(controlByte)
+      self.operands.append(operand)
+
+   # Returns the instruction name of row 'index', or "" if illegal
+   def getMnemonic(self, index):
+      entry=self._table[self.controlBytes[index]]
+      return(entry[0] if entry else "")
+
+   # Returns the addressing mode of row 'index', or "" if illegal
+   def getAddressing(self, index):
+      entry=self._table[self.controlBytes[index]]
+      return(entry[1] if entry else "")
+
+   # Returns the number of bytes used by row 'index' (1 if illegal)
+   def getLength(self, index):
+      if self.truncated and self.addresses[index] in self.truncated:
+         return(self.truncated[self.addresses[index]])
+      entry=self._table[self.controlBytes[index]]
+      return(entry[2] if entry else 1)
+
+   # Returns the base cycle count of row 'index' (0 if illegal)
+   def getCycles(self, index):
+      entry=self._table[self.controlBytes[index]]
+      return(entry[3] if entry else 0)
+
+   # Returns a new stream holding only the rows matching the given
+   # mnemonic(s) and/or addressing mode(s).  Either argument may be a single
+   # string or a collection of strings.  Matching is done on the control
+   # byte column alone, so no per-row objects are created.
+   def filter(self, mnemonic=None, mode=None) -> InstructionStream:
+      if isinstance(mnemonic, str):
+         mnemonic=(mnemonic,)
+      if isinstance(mode, str):
+         mode=(mode,)
+      if mnemonic is not None:
+         mnemonic={m.upper() for m in mnemonic}
+
+      # One byte per control byte value: 1 keeps the row, 0 drops it
+      mask=bytearray(256)
+      for value, entry in enumerate(self._table):
+         if entry is None:
+            continue
+         if mnemonic is not None and entry[0] not in mnemonic:
+            continue
+         if mode is not None and entry[1] not in mode:
+            continue
+         mask[value]=1
+      hits=self.controlBytes.translate(mask)
+
+      stream=InstructionStream(self.kdis)
+      stream.addresses=array("H", compress(self.addresses, hits))
+      stream.controlBytes=bytearray(compress(self.controlBytes, hits))
+      stream.operands=array("H", compress(self.operands, hits))
+      stream.truncated=dict(self.truncated)
+      return(stream)
+
+   # Returns the number of bytes held by the column storage
+   def sizeof(self):
+      return(self.addresses.itemsize*len(self.addresses) +
+             len(self.controlBytes) +
+             self.operands.itemsize*len(self.operands))
+
+   # Implements len routine for class, based on number of rows
+   def __len__(self):
+      return(len(self.controlBytes))
+
+   # Integer index returns a lazy row view; a slice returns a new stream
+   def __getitem__(self, key):
+      if isinstance(key, slice):
+         stream=InstructionStream(self.kdis)
+         stream.addresses=self.addresses[key]
+         stream.controlBytes=self.controlBytes[key]
+         stream.operands=self.operands[key]
+         stream.truncated=dict(self.truncated)
+         return(stream)
+      if key<0:
+         key+=len(self)
+      if key<0 or key>=len(self):
+         raise IndexError("InstructionStream index out of range")
+      return(InstructionView(self, key))
+
+   def __iter__(self):
+      for i in range(len(self)):
+         yield InstructionView(self, i)
+
+   # Implements str() function
+   def __str__(self):
+      return(self.toString())
+
+   # Renders the stream as an address-prefixed listing
+   def toString(self):
+      return("\n".join(f"${row.address:04X}{INDENT}{row.toString()}" for row in self))
+
+#*************************************************************************
+
+#*************************************************************************
+# Platform memory map, resolving addresses to symbol names.
+# Symbols are (start, end, name, description) ranges and may nest, e.g.
+# VIC_BORDER inside VIC; the innermost (smallest) range wins.
+# compile() flattens the ranges into sorted, non-overlapping segments held
+# in two parallel arrays, so resolve() is a binary search: O(log n), with
+# no per-node objects as a tree would need, and trivially saved to disk.
+# Resolved names are memoised per address.  fromFile() saves the compiled
+# map beside its source ("<map>.cache") and reuses it on later runs until
+# the source's modification time or size changes.
+class SymbolMap:
+
+   def __init__(self, name=""):
+      self.name=name
+      self.symbols=[]
+      self.starts=array("L")
+      self.owners=array("l")
+      self.__resolved={}
+
+   # Adds a symbol spanning start..end inclusive; call compile() afterwards
+   def add(self, start, end, name, description=""):
+      self.symbols.append((start, end, name, description))
+
+   # Builds the segment index from the symbol list
+   def compile(self):
+      boundaries=set()
+      for start, end, name, description in self.symbols:
+         boundaries.add(start)
+         boundaries.add(end+1)
+      boundaries.add(0)
+
+      # Smallest ranges first, so the first hit is the innermost symbol
+      bySize=sorted(range(len(self.symbols)),
+                    key=lambda i: self.symbols[i][1]-self.symbols[i][0])
+      self.starts=array("L")
+      self.owners=array("l")
+      for boundary in sorted(boundaries):
+         owner=-1
+         for i in bySize:
+            if self.symbols[i][0]<=boundary<=self.symbols[i][1]:
+               owner=i
+               break
+         if len(self.owners)==0 or self.owners[-1]!=owner:
+            self.starts.append(boundary)
+            self.owners.append(owner)
+      self.__resolved={}
+
+   # Returns the (start, end, name, description) symbol holding an address,
+   # or None if the address is not mapped
+   def getSymbol(self, address):
+      owner=self.owners[bisect_right(self.starts, address)-1]
+      return(self.symbols[owner] if owner>=0 else None)
+
+   # Returns the symbolic name of an address, e.g. "VIC_BORDER" or
+   # "SID+$04", or "" if the address is not mapped
+   def resolve(self, address):
+      name=self.__resolved.get(address)
+      if name is None:
+         symbol=self.getSymbol(address)
+         if symbol is None:
+            name=""
+         elif address==symbol[0]:
+            name=symbol[2]
+         else:
+            name=f"{symbol[2]}+${address-symbol[0]:02X}"
+         self.__resolved[address]=name
+      return(name)
+
+   # Implements len routine for class, based on number of symbols
+   def __len__(self):
+      return(len(self.symbols))
+
+   # Saves the compiled map as JSON, tagged with the source file's stamp.
+   # A cache that cannot be written is not an error; it is rebuilt next run.
+   def saveCompiled(self, cachefile, stamp):
+      try:
+         with open(cachefile, 'w') as file:
+            json.dump({"stamp": stamp, "symbols": self.symbols,
+                       "starts": self.starts.tolist(),
+                       "owners": self.owners.tolist()}, file)
+      except OSError as e:
+         note(f"Could not write symbol cache {cachefile}: {e}")
+
+   # Loads a compiled map saved by saveCompiled(). Returns False if the
+   # cache is missing, unreadable, inconsistent, or was built from a
+   # different source; the caller then rebuilds it from the map file.
+   def loadCompiled(self, cachefile, stamp):
+      try:
+         with open(cachefile, 'r') as file:
+            data=json.load(file)
+         if data["stamp"]!=stamp:
+            return(False)
+         symbols=[tuple(symbol) for symbol in data["symbols"]]
+         starts=array("L", data["starts"])
+         owners=array("l", data["owners"])
+
+         # resolve() relies on these; never trust a cache that breaks them
+         if (len(starts)==0 or starts[0]!=0 or len(starts)!=len(owners) or
+             any(starts[i]>=starts[i+1] for i in range(len(starts)-1)) or
+             any(owner<-1 or owner>=len(symbols) for owner in owners) or
+             any(len(symbol)!=4 for symbol in symbols)):
+            return(False)
+
+         self.symbols=symbols
+         self.starts=starts
+         self.owners=owners
+         self.__resolved={}
+         return(True)
+      except (OSError, ValueError, KeyError, TypeError):
+         return(False)
+
+   # Loads a START,END,NAME,DESCRIPTION map file.  Addresses may be written
+   # as $FFD2, 0xFFD2 or decimal.  The compiled map is read from, or saved
+   # to, the "<path>.cache" file keyed by the source's mtime and size.
+   # This is a factory method so it must be static
+   @staticmethod
+   def fromFile(path) -> SymbolMap:
+      try:
+         stamp=[os.path.getmtime(path), os.path.getsize(path)]
+         cachefile=path+DEF_SYMCACHE
+         symbols=SymbolMap(os.path.basename(path))
+         if symbols.loadCompiled(cachefile, stamp):
+            note(f"Loaded compiled symbol map from {cachefile}")
+            return(symbols)
+
+         with open(path, 'r', encoding="utf-8-sig") as file:
+            lines=file.readlines()
+
+         for line in lines[1:]:
+            seg=line.rstrip().split(',')
+            if len(seg)<3:
+               continue
+            start, end=(int(x[1:], 16) if x.startswith("$") else int(x, 0) for x in seg[:2])
+            symbols.add(start, end, seg[2], seg[3] if len(seg)>3 else "")
+         symbols.compile()
+         symbols.saveCompiled(cachefile, stamp)
+         return(symbols)
+
+      except Exception as e:
+         error(f"File access error to {path}\n\"{e}\"")
+
+#*************************************************************************
+
 # Show utility syntax and exits
 def showHelp():
    s=f'''
@@ -405,12 +1024,16 @@ Options
   {C.clm}-o, --overwrite{C.coff}  {C.clgy}Overwrites prior disassembly file{C.coff}
   {C.clm}-v, --verbose{C.coff}    {C.clgy}Turns on extra ouput mode{C.coff}
   {C.clm}-l, --log{C.coff}        {C.clgy}Enables logging to {C.clg}{DEF_LOGFILE}{C.coff}
+  {C.clm}-p, --pages{C.coff}      {C.clgy}Reports page crossing cycle penalties instead of a listing{C.coff}
+  {C.clm}-c, --c64{C.coff}        {C.clgy}Annotates operands using the Commodore 64 symbol map{C.coff}
+  {C.clm}--symbols=FILE{C.coff}   {C.clgy}Annotates operands using a START,END,NAME symbol map{C.coff}
+  {C.clm}--index=N{C.coff}        {C.clgy}Largest index value assumed by {C.clg}--pages{C.clgy} (default {C.clg}{DEF_INDEXMAX}{C.clgy}){C.coff}
   {C.clm}-t, --test{C.coff}       {C.clgy}Performs module unit tests{C.coff}
   {C.clm}--version{C.coff}        {C.clgy}Reports utility version{C.coff}
   
 
 {C.cly}<inputfile>{C.off} a valid 6502 assembly
-{C.cly}<outputfile>{C.off} defaults to {C.clc}"<inputfile>.asm"{C.off} if not specified
+{C.cly}<outputfile>{C.off} defaults to {C.clc}"<inputfile>.asm"{C.off} (or {C.clc}"<inputfile>.pages"{C.off}) if not specified
 '''
    print(s)
    exit()
@@ -516,8 +1139,9 @@ def parseCommandLine():
    # Extended options (--) must have a '=' suffix if value is expected
    try:
        opts, args =getopt.getopt(argv[1:],
-        "?SDvhnotl",
-        ["help","version","verbose", "DEBUG", "header", "test", "log"])
+        "?SDvhnotlpc",
+        ["help","version","verbose", "DEBUG", "header", "test", "log", "pages", "index=",
+         "c64", "symbols="])
    except getopt.GetoptError as e:
       error(f"Arguments error: ({e.opt})=>{e.msg}")
       showHelp()
@@ -553,6 +1177,26 @@ def parseCommandLine():
       elif (opt in("-o", "--overwrite")):
          config.isOverwrite=True
 
+      # Report page crossing penalties instead of a listing
+      elif (opt in("-p", "--pages")):
+         config.isPages=True
+
+      # Largest plausible index register value for page analysis
+      elif (opt in("--index",)):
+         try:
+            config.indexMax=int(arg, 0)
+         except ValueError:
+            error(f"Invalid index value: {arg}")
+         if not 0<=config.indexMax<=0xFF:
+            error(f"Index value must be from 0 to $FF: {arg}")
+
+      # Annotate operands with a platform symbol map
+      elif (opt in("-c", "--c64")):
+         config.symbolfile=DEF_C64MAP
+
+      elif (opt in("--symbols",)):
+         config.symbolfile=arg
+
       # Is this is a unit test?
       elif (opt in("-t", "--test")):
          config._TEST=True
@@ -584,7 +1228,7 @@ def parseCommandLine():
       else:
          # TODO: This fails on a file with multiple '.' in filename
          preamble=config.inputfile.split('.')
-         config.outputfile=preamble[0] + DEF_OUTEXT
+         config.outputfile=preamble[0] + (DEF_PAGEEXT if config.isPages else DEF_OUTEXT)
 
    # If we are here, all options and arguments have been parsed;
    # validate output file.
@@ -647,6 +1291,45 @@ def disassemble(kdis, config):
    note (f"Closing binary input file: {config.inputfile}")
    file.close()
    
+# Reports every instruction in an input binary which pays a page crossing
+# cycle penalty, ranked so that findings inside loops come first.
+# Like disassemble(), this handles I/O and messaging only; the analysis
+# itself is done by the KDis6502 class object.
+def analyzePages(kdis, config):
+   note (f"Analyzing page crossings in: {config.inputfile} to report file: {config.outputfile}")
+
+   with open(config.inputfile, 'rb') as file:
+      data=file.read()
+
+   origin=0
+   if (config.hasHeader):
+      origin=int.from_bytes(data[:2], "little")
+      data=data[2:]
+
+   stream=InstructionStream.fromBytes(kdis, data, origin)
+   note (f"Decoded {len(stream)} instructions from ${origin:04X}")
+   findings=kdis.findPagePenalties(stream, config.indexMax)
+
+   header=f'''
+; **********************************************************************************
+; Page crossing report for {config.inputfile}
+;
+; Index values up to ${config.indexMax:02X} assumed; findings inside loops listed first.
+; Analyzed by {APP_NAME} on {datetime.datetime.now():%Y-%m-%d @ %H:%M:%S}
+; **********************************************************************************
+'''
+   slog(header)
+
+   for finding in findings:
+      row=stream[finding["index"]]
+      loop=f"loop depth {finding['depth']}" if finding["depth"] else "not in loop"
+      slog(f"{INDENT}${row.address:04X}  {row.toString():<16} ; +{finding['penalty']} cycle, "
+           f"{finding['kind']}, {loop}: {finding['reason']}")
+
+   total=sum(f["penalty"] for f in findings)
+   slog("")
+   slog(f"{INDENT}; {len(findings)} findings, up to {total} extra cycles per pass")
+
 ### Program mainline ###
       
 def main():
@@ -669,11 +1352,15 @@ def main():
 
    # Construct disassembler engine
    kdis6502=Kdis6502()
+   if (config.symbolfile):
+      kdis6502.setSymbols(SymbolMap.fromFile(config.symbolfile))
 
    # DEBUGGING
    if config.isTest():
       pip("Running unit tests...")
       doTest(kdis6502, config)
+   elif config.isPages:
+      analyzePages(kdis6502, config)
    else:
       disassemble(kdis6502, config)
 
@@ -709,6 +1396,84 @@ def doTest(kdis6502, config):
       print(f"{C.clg}Addressing: {C.cwh}{kdis6502.getAddressing(cb)}")
       print(f"{C.off}")
 
+   # Compact instruction stream tests
+   # LDX #$00 / LDA $C100,X / STA $0400,X / INX / BNE -9 / RTS
+   code=bytes.fromhex("A200BD00C19D0004E8D0F760")
+   stream=InstructionStream.fromBytes(kdis6502, code, 0xC000)
+   print(f"{C.clg}Decoded stream of {C.cwh}{len(stream)}{C.clg} instructions:{C.cwh}")
+   print(stream)
+   print(f"{C.clg}Bytes per instruction: {C.cwh}{stream.sizeof()/len(stream):.1f}")
+   print(f"{C.clg}abs-x rows:  {C.cwh}{[str(row) for row in stream.filter(mode='abs-x')]}")
+   print(f"{C.clg}BNE rows:    {C.cwh}{[str(row) for row in stream.filter(mnemonic='BNE')]}")
+   print(f"{C.clg}Last 2 rows: {C.cwh}{[str(row) for row in stream[-2:]]}")
+   stream=InstructionStream.fromBytes(kdis6502, bytes.fromhex("E8AD00"), 0xC000)
+   print(f"{C.clg}Truncated:   {C.cwh}{[str(row) for row in stream]}")
+   print(f"{C.off}")
+
+   # Page crossing tests: same loop placed so that the table base sits near
+   # a page end, and so that the loop branch crosses back into $BF.
+   stream=InstructionStream.fromBytes(kdis6502, bytes.fromhex("A200BDF0C19D0004E8D0F760"), 0xBFFA)
+   print(f"{C.clg}Page crossing penalties:{C.cwh}")
+   for finding in kdis6502.findPagePenalties(stream):
+      print(f"{stream[finding['index']]} -> {finding}")
+
+   # ADC $C1F0,X / ADC $C1F0,Y / BCC back across the page: each costs +1
+   stream=InstructionStream.fromBytes(kdis6502, bytes.fromhex("7DF0C179F0C190F8"), 0xBFF8)
+   findings=kdis6502.findPagePenalties(stream)
+   for finding in findings:
+      print(f"{stream[finding['index']]} -> {finding}")
+   print(f"{C.clg}ADC / BCC penalties as expected? {C.cwh}"
+         f"{sorted((f['address'], f['penalty']) for f in findings)==[(0xBFF8, 1), (0xBFFB, 1), (0xBFFE, 1)]}")
+
+   # Pointer $FB set to $20F0, then its low byte overwritten through abs:
+   # the following LDA ($FB),Y must not be reported from the stale base.
+   stream=InstructionStream.fromBytes(kdis6502, bytes.fromhex("A9F085FBA92085FCA9008DFB00B1FB60"), 0x1000)
+   print(f"{C.clg}Stale pointer ignored? {C.cwh}{kdis6502.findPagePenalties(stream)==[]}")
+
+   # Pointer $FB set to $C1F0 before a loop that only writes Y and $0400,Y:
+   # the pointer survives the loop head, so LDA ($FB),Y is reported.
+   stream=InstructionStream.fromBytes(kdis6502, bytes.fromhex("A9F085FBA9C185FCA000B1FB990004C8D0F8"), 0x1000)
+   findings=kdis6502.findPagePenalties(stream)
+   print(f"{C.clg}Pointer kept across loop? {C.cwh}"
+         f"{[(f['address'], f['depth']) for f in findings]==[(0x100A, 1)]}")
+   print(f"{C.off}")
+
+   # Symbol map tests
+   symbols=SymbolMap.fromFile(DEF_C64MAP)
+   print(f"{C.clg}{symbols.name}: {C.cwh}{len(symbols)}{C.clg} symbols in {C.cwh}{len(symbols.starts)}{C.clg} segments")
+   cached=SymbolMap.fromFile(DEF_C64MAP)
+   print(f"{C.clg}Compiled cache {C.cwh}{DEF_C64MAP+DEF_SYMCACHE}{C.clg} matches? {C.cwh}"
+         f"{os.path.isfile(DEF_C64MAP+DEF_SYMCACHE) and cached.starts==symbols.starts and cached.owners==symbols.owners}")
+   with open(DEF_C64MAP+DEF_SYMCACHE, 'r') as file:
+      data=json.load(file)
+   data["owners"][-1]=999
+   with open(DEF_C64MAP+DEF_SYMCACHE, 'w') as file:
+      json.dump(data, file)
+   print(f"{C.clg}Corrupt cache rebuilt? {C.cwh}{SymbolMap.fromFile(DEF_C64MAP).owners==symbols.owners}")
+   for address in (0xD020, 0xD404, 0xFFD2, 0x00FB, 0x0401, 0xC000):
+      print(f"{C.clg}${address:04X} -> {C.cwh}{symbols.resolve(address)!r}")
+
+   # Measure the cost of annotating a rendered listing: after a warm-up
+   # pass, 7 rounds alternate plain and symbolised passes, and the best of
+   # each is kept, so that timer noise and load drift are not reported.
+   code=bytes.fromhex("A9008D20D0AD12D020D2FFB1FB9D0004") * 4096
+   stream=InstructionStream.fromBytes(kdis6502, code, 0xC000)
+   render=lambda: [row.toString() for row in stream]
+   mappings=(None, symbols)
+   timings=[float("inf")]*len(mappings)
+   for sample in range(8):
+      for i, mapping in enumerate(mappings):
+         kdis6502.setSymbols(mapping)
+         elapsed=timeit.timeit(render, number=1)
+         if sample>0:
+            timings[i]=min(timings[i], elapsed)
+   print(f"{C.clg}Annotated:{C.cwh}")
+   print(stream[:6])
+   kdis6502.setSymbols(None)
+   print(f"{C.clg}Rendered {C.cwh}{len(stream)}{C.clg} rows in {C.cwh}{timings[0]*1000:.1f}{C.clg} ms plain, "
+         f"{C.cwh}{timings[1]*1000:.1f}{C.clg} ms symbolised, best of 7 ({C.cwh}{(timings[1]/timings[0]-1)*100:+.1f}%{C.clg})")
+   print(f"{C.off}")
+
 # END of Test Case(s)
 
 